@@ -1,11 +1,20 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.driver_finder import DriverFinder
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selectolax.lexbor import LexborHTMLParser
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import httpx
 import pandas as pd
+import csv
+import json
 import re
-import time
+import sqlite3
+import threading
 from datetime import datetime
 
 # ========================
@@ -13,7 +22,7 @@ from datetime import datetime
 # ========================
 CATEGORIES = [
     ("Cement", "https://www.randtech.co.ke/product-category/flooring/cement/"),
-    ("paint", " https://www.randtech.co.ke/product-category/paint/"),
+    ("paint", "https://www.randtech.co.ke/product-category/paint/"),
     ("Solar Lights", "https://www.randtech.co.ke/product-category/electricals/solar-lights/"),
     ("Plumbing", "https://www.randtech.co.ke/product-category/plumbing/"),
     ("Tanks", "https://www.randtech.co.ke/product-category/building-materials/tanks/")
@@ -22,109 +31,405 @@ CATEGORIES = [
 # Format: day-month-year
 TIMESTAMP = datetime.now().strftime('%d-%m-%Y')
 FILE_NAME = f"Randtech_Products{TIMESTAMP}.xlsx"
+CSV_FILE = FILE_NAME.replace('.xlsx', '.csv')
+WRITE_EXCEL = True  # post-process the CSV into Excel (+ Parquet); set False when CSV is enough
+SCRAPED_AT = datetime.now().isoformat(timespec='seconds')  # tags the rows saved by this run
+
+# chromedriver binary for the Selenium fallback; None lets Selenium Manager find or download it
+CHROMEDRIVER_PATH = None
+
+# Local store reused across runs (page cache for conditional GETs + scraped products)
+DB_FILE = "randtech.db"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+}
+
+# Field order of every scraped product row
+PRODUCT_COLUMNS = ["Category", "Description", "Product Name", "Price", "Link", "Image"]
+
+# CSS selectors evaluated against each div.product-small card
+CARD_SELECTOR = "div.product-small"
+NAME_SELECTOR = ".box-text .name.product-title"
+DESCRIPTION_SELECTOR = ".box-text .category"
+PRICE_SELECTOR = "span.woocommerce-Price-amount"
+LINK_SELECTOR = "a[href]"
+IMAGE_SELECTOR = "img"
+PAGE_NUMBERS_SELECTOR = "ul.page-numbers .page-numbers"
+
+# The same card fields and pager, read in-browser by the Selenium fallback
+EXTRACT_PAGE_JS = """
+const cards = Array.from(document.querySelectorAll(%(card)s)).map(c => {
+    const n = c.querySelector(%(name)s);
+    const d = c.querySelector(%(description)s);
+    const p = c.querySelector(%(price)s);
+    const a = c.querySelector(%(link)s);
+    const i = c.querySelector(%(image)s);
+    return [n ? n.innerText : 'N/A', d ? d.innerText : '', p ? p.innerText : 'N/A', a ? a.href : '', i ? (i.dataset.src || i.src) : ''];
+});
+const pages = Array.from(document.querySelectorAll(%(pages)s))
+    .map(e => parseInt(e.innerText, 10))
+    .filter(n => !isNaN(n));
+return {cards: cards, lastPage: Math.max(1, ...pages)};
+""" % {
+    # json.dumps turns each selector into a quoted JS string literal
+    "card": json.dumps(CARD_SELECTOR),
+    "name": json.dumps(NAME_SELECTOR),
+    "description": json.dumps(DESCRIPTION_SELECTOR),
+    "price": json.dumps(PRICE_SELECTOR),
+    "link": json.dumps(LINK_SELECTOR),
+    "image": json.dumps(IMAGE_SELECTOR),
+    "pages": json.dumps(PAGE_NUMBERS_SELECTOR)
+}
+
+# detect qty + unit (supports bags, meters, etc.)
+QTY_RE = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(ml|l|g|kg|pcs|pack|pieces|grams|kilos|ltr|litres|bags?|m|meters?)',
+    re.IGNORECASE
+)
+
+# canonical spelling of every unit QTY_RE can capture (upper-case, plural S dropped)
+UNITS = {
+    "ml": "ML", "l": "L", "g": "G", "kg": "KG", "pcs": "PC", "pack": "PACK",
+    "pieces": "PIECE", "grams": "GRAM", "kilos": "KILO", "ltr": "LTR", "litres": "LITRE",
+    "bag": "BAG", "bags": "BAG", "m": "M", "meter": "METER", "meters": "METER"
+}
+
+# Network limits shared by every category scrape
+MAX_CONCURRENT_REQUESTS = 10
+MAX_CONNECTIONS = 20
+REQUEST_TIMEOUT = 30
+MAX_BROWSERS = 5  # headless Chromes scraping Selenium fallback categories in parallel
 
 # ========================
 # SELENIUM DRIVER SETUP
 # ========================
-def setup_driver():
+def start_driver_service(options):
+    # one long-lived chromedriver process; browsers attach to it via webdriver.Remote
+    service = Service(executable_path=CHROMEDRIVER_PATH)
+    if not service.path:
+        # the lookup webdriver.Chrome does on its own: SE_CHROMEDRIVER, then Selenium Manager,
+        # which may also supply the Chrome binary itself
+        finder = DriverFinder(service, options)
+        service.path = service.env_path() or finder.get_driver_path()
+        browser_path = finder.get_browser_path()
+        if browser_path:
+            options.binary_location = browser_path
+    service.start()
+    return service
+
+def chrome_options():
     options = Options()
-    options.add_argument("--start-maximized")
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
     options.add_argument("--disable-notifications")
     options.add_argument("--disable-popup-blocking")
-    driver = webdriver.Chrome(options=options)
+    # only the product card text is read, so skip images and subresources
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    options.page_load_strategy = 'eager'  # driver.get returns at DOMContentLoaded
+    return options
+
+def setup_driver(service, options):
+    driver = webdriver.Remote(command_executor=service.service_url, options=options)
     driver.set_page_load_timeout(180)
     return driver
 
+# ========================
+# PARSING FUNCTION
+# ========================
+def first_text(card, selector, default):
+    node = card.css_first(selector)
+    # join child text nodes with a space, like innerText in the Selenium fallback
+    return node.text(separator=" ", strip=True) if node else default
+
+def parse_page(content, category_name, page_url):
+    # selectolax's lexbor backend (C HTML parser): a few ms per page
+    tree = LexborHTMLParser(content)
+    products = []
+
+    for card in tree.css(CARD_SELECTOR):
+        anchor = card.css_first(LINK_SELECTOR)
+        link = (anchor.attributes.get("href") or "") if anchor else ""
+        img = card.css_first(IMAGE_SELECTOR)
+        # lazy-loaded images keep the real URL in data-src
+        image = (img.attributes.get("data-src") or img.attributes.get("src") or "") if img else ""
+        # resolve relative URLs, as the browser does for the Selenium fallback
+        link = urljoin(page_url, link) if link else ""
+        image = urljoin(page_url, image) if image else ""
+
+        products.append((
+            category_name,
+            first_text(card, DESCRIPTION_SELECTOR, ""),
+            first_text(card, NAME_SELECTOR, "N/A"),
+            first_text(card, PRICE_SELECTOR, "N/A"),
+            link,
+            image
+        ))
+
+    # highest numbered link in the WooCommerce pager, 1 when there is no pager
+    page_numbers = [node.text(separator=" ", strip=True) for node in tree.css(PAGE_NUMBERS_SELECTOR)]
+    last_page = max((int(text) for text in page_numbers if text.isdigit()), default=1)
+
+    return products, last_page
+
+# ========================
+# LOCAL DATABASE (PAGE CACHE + PRODUCTS)
+# ========================
+def open_db():
+    # the Selenium fallback threads each write through their own connection:
+    # WAL lets them commit alongside readers, the timeout waits out each other's locks
+    conn = sqlite3.connect(DB_FILE, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pages("
+        "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, products TEXT, last_page INTEGER)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS products("
+        "link TEXT PRIMARY KEY, category TEXT, description TEXT, name TEXT, price TEXT, image TEXT, scraped_at TEXT)"
+    )
+    return conn
+
+def load_cached_page(conn, page_url):
+    return conn.execute(
+        "SELECT etag, last_modified, products, last_page FROM pages WHERE url = ?", (page_url,)
+    ).fetchone()
+
+def store_cached_page(conn, page_url, etag, last_modified, products, last_page):
+    conn.execute(
+        "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+        (page_url, etag, last_modified, json.dumps(products), last_page)
+    )
+    conn.commit()
+
+def save_products(conn, products):
+    # rows are keyed on the link, so link-less cards would all overwrite one another
+    rows = [(*product, SCRAPED_AT) for product in products if product[4]]
+    if len(rows) < len(products):
+        print(f"⚠️ Skipped {len(products) - len(rows)} {products[0][0]} products without a link.")
+
+    # written page by page, so a crashed run keeps everything scraped so far
+    conn.executemany(
+        "INSERT OR REPLACE INTO products(category, description, name, price, link, image, scraped_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+
+def export_products_csv(conn, csv_file):
+    # streams this run's rows from SQLite to disk without holding them all in memory
+    cursor = conn.execute(
+        "SELECT category, description, name, price, link, image FROM products WHERE scraped_at = ?",
+        (SCRAPED_AT,)
+    )
+    count = 0
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_COLUMNS)
+        for row in cursor:
+            writer.writerow(row)
+            count += 1
+    return count
+
 # ========================
 # SCRAPING FUNCTION
 # ========================
-def scrape_category(driver, category_name, category_url):
+def build_page_url(category_url, page_number):
+    return category_url if page_number == 1 else f"{category_url}page/{page_number}/"
+
+async def fetch_page(client, semaphore, page_url, cached=None):
+    # returns (status, body, etag, last_modified); status is None on network errors
+    headers = {}
+    if cached:
+        etag, last_modified = cached[0], cached[1]
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    async with semaphore:
+        try:
+            response = await client.get(page_url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"⚠️ Error loading {page_url}: {str(e)} — skipping.")
+            return None, None, None, None
+
+    # 304: unchanged since last run; 404: WooCommerce page past the last one
+    if response.status_code in (304, 404):
+        return response.status_code, None, None, None
+    if response.status_code != 200:
+        print(f"⚠️ Error loading {page_url}: HTTP {response.status_code} — skipping.")
+        return response.status_code, None, None, None
+    return 200, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+async def scrape_page(client, semaphore, db, category_name, category_url, page_number):
+    # returns (products saved, last page number)
+    page_url = build_page_url(category_url, page_number)
+    cached = load_cached_page(db, page_url)
+    status, content, etag, last_modified = await fetch_page(client, semaphore, page_url, cached)
+
+    if status == 304:
+        products, last_page = json.loads(cached[2]), cached[3]
+    elif status == 200:
+        products, last_page = parse_page(content, category_name, page_url)
+        if etag or last_modified:
+            store_cached_page(db, page_url, etag, last_modified, products, last_page)
+    else:
+        return 0, 0  # last_page 0 marks a page that could not be fetched
+
+    if products:
+        save_products(db, products)
+        print(f"✅ Found {len(products)} products on {category_name} page {page_number}")
+    return len(products), last_page
+
+async def scrape_category(client, semaphore, db, category_name, category_url):
+    # returns False when the category has to be scraped with Selenium instead
     print(f"\n🔍 Scraping category: {category_name}")
-    products = []
+
+    # page 1 tells us how many pages the category has
+    found, last_page = await scrape_page(client, semaphore, db, category_name, category_url, 1)
+
+    if not found:
+        if last_page == 0:
+            print(f"⚠️ Could not load {category_name} — skipping.")
+            return True
+        print(f"⚠️ No products in raw HTML for {category_name} — falling back to Selenium.")
+        return False
+
+    await asyncio.gather(*[
+        scrape_page(client, semaphore, db, category_name, category_url, page_number)
+        for page_number in range(2, last_page + 1)
+    ])
+    return True
+
+def open_client():
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS, keepalive_expiry=30
+    )
+    client_options = dict(headers=HEADERS, limits=limits, timeout=REQUEST_TIMEOUT, follow_redirects=True)
+    try:
+        # HTTP/2 multiplexes the page requests over a single TLS connection
+        return httpx.AsyncClient(http2=True, **client_options)
+    except ImportError as e:
+        # h2 is an optional extra: pip install "httpx[http2]"
+        print(f"⚠️ HTTP/2 unavailable, using HTTP/1.1: {str(e)}")
+        return httpx.AsyncClient(http2=False, **client_options)
+
+async def scrape_all_categories():
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    db = open_db()
+
+    try:
+        async with open_client() as client:
+            results = await asyncio.gather(*[
+                scrape_category(client, semaphore, db, cat_name, cat_url)
+                for cat_name, cat_url in CATEGORIES
+            ])
+    finally:
+        db.close()
+
+    print("Session closed.")
+    return [category for category, done in zip(CATEGORIES, results) if not done]
+
+# ========================
+# SELENIUM FALLBACK
+# ========================
+def page_with_cards(driver):
+    # WebDriverWait condition: the extracted page, once its cards are in the DOM
+    page = driver.execute_script(EXTRACT_PAGE_JS)
+    return page if page["cards"] else None
+
+def scrape_category_selenium(driver, db, category_name, category_url):
+    print(f"\n🔍 Scraping category with Selenium: {category_name}")
+    driver.delete_all_cookies()  # same browser, clean session for every category
     page_number = 1
 
     while True:
-        page_url = category_url if page_number == 1 else f"{category_url}page/{page_number}/"
+        page_url = build_page_url(category_url, page_number)
         try:
             driver.get(page_url)
         except Exception as e:
             print(f"⚠️ Error loading page {page_number}: {str(e)} — skipping.")
             break
 
+        # eager page loads return on DOMContentLoaded, before late-injected cards;
+        # poll the one-round-trip extractor itself until the cards show up
         try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.product-small"))
-            )
-        except:
-            print(f"✅ No more products found on page {page_number}.")
-            break
-
-        product_cards = driver.find_elements(By.CSS_SELECTOR, "div.product-small")
+            page = WebDriverWait(driver, 10, poll_frequency=0.2).until(page_with_cards)
+        except TimeoutException:
+            page = {"cards": [], "lastPage": page_number}
 
+        product_cards = page["cards"]
         if not product_cards:
             print(f"✅ No more products found on page {page_number}.")
             break
 
         print(f"✅ Found {len(product_cards)} products on page {page_number}")
 
-        for card in product_cards:
-            try:
-                # product name
-                try:
-                    name = card.find_element(By.CSS_SELECTOR, ".box-text .name.product-title").text
-                except:
-                    name = "N/A"
-
-                # product description (short text)
-                try:
-                    description = card.find_element(By.CSS_SELECTOR, ".box-text .category").text
-                except:
-                    description = ""
-
-                # product price
-                try:
-                    price = card.find_element(By.CSS_SELECTOR, "span.woocommerce-Price-amount").text
-                except:
-                    price = "N/A"
-
-                products.append({
-                    "Category": category_name,
-                    "Description": description,
-                    "Product Name": name,
-                    "Price": price
-                })
-
-            except Exception as e:
-                print(f"⚠️ Error extracting product: {str(e)}")
-                continue
+        save_products(db, [
+            (category_name, description, name, price, link, image)
+            for name, description, price, link, image in product_cards
+        ])
+
+        # the pager already says where the category ends; no need to load an overflow page
+        if page_number >= page["lastPage"]:
+            print(f"✅ Reached last page ({page_number}).")
+            break
 
         page_number += 1
-        time.sleep(2)
 
-    return products
+def scrape_categories_selenium(categories):
+    options = chrome_options()
+    service = start_driver_service(options)
+    thread_state = threading.local()
+    drivers = []
+
+    def thread_driver():
+        # each worker thread lazily gets its own browser on the shared chromedriver
+        if not hasattr(thread_state, "driver"):
+            thread_state.driver = setup_driver(service, options)
+            drivers.append(thread_state.driver)
+        return thread_state.driver
+
+    def scrape(category):
+        cat_name, cat_url = category
+        db = open_db()  # sqlite connections stay on the thread that opened them
+        try:
+            scrape_category_selenium(thread_driver(), db, cat_name, cat_url)
+        except Exception as e:
+            # one broken browser must not lose the other categories
+            print(f"⚠️ Selenium scrape of {cat_name} failed: {str(e)} — skipping.")
+        finally:
+            db.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(MAX_BROWSERS, len(categories))) as executor:
+            list(executor.map(scrape, categories))
+    finally:
+        for driver in drivers:
+            driver.quit()
+        service.stop()
+        print("Browsers closed.")
 
 # ========================
 # SPLIT PRODUCT DETAILS
 # ========================
-def split_product_details(full_name):
-    if not isinstance(full_name, str):
-        return pd.Series({'Product_Name': None, 'Quantity': None, 'Unit': None})
-
-    # detect qty + unit (supports bags, meters, etc.)
-    quantity_pattern = r'(?i)(\d+(?:\.\d+)?)\s*(ml|l|g|kg|pcs|pack|pieces|grams|kilos|ltr|litres|bags?|m|meters?)'
-    quantity_match = re.search(quantity_pattern, full_name)
-
-    if quantity_match:
-        qty_value = quantity_match.group(1)
-        qty_unit = quantity_match.group(2).upper()
-        if qty_unit.endswith("S"):  # normalize plural
-            qty_unit = qty_unit.rstrip("S")
-        product_name = re.split(quantity_pattern, full_name, maxsplit=1, flags=re.IGNORECASE)[0].strip()
-    else:
-        product_name = full_name
-        qty_value, qty_unit = None, None
-
-    return pd.Series({
+def split_product_details(full_names):
+    # one vectorized pass over the whole column instead of a Python call per row
+    extracted = full_names.str.extract(QTY_RE, expand=True)
+    qty_value = extracted[0]
+    qty_unit = extracted[1].str.lower().map(UNITS)  # normalize case + plural in one lookup
+
+    # text before the quantity; names without one are kept as-is
+    product_name = (
+        full_names.str.split(QTY_RE, n=1, expand=True)[0]
+        .str.strip()
+        .where(qty_value.notna(), full_names)
+    )
+
+    return pd.DataFrame({
         'Product_Name': product_name,
         'Quantity': qty_value,
         'Unit': qty_unit
@@ -134,54 +439,62 @@ def split_product_details(full_name):
 # MAIN FUNCTION
 # ========================
 def main():
-    driver = setup_driver()
-    all_products = []
+    fallback_categories = asyncio.run(scrape_all_categories())
+    if fallback_categories:
+        try:
+            scrape_categories_selenium(fallback_categories)
+        except Exception as e:
+            # e.g. chromedriver failed to start; still export what the HTTP path saved
+            print(f"⚠️ Selenium fallback failed: {str(e)} — exporting what was scraped.")
 
+    db = open_db()
     try:
-        for cat_name, cat_url in CATEGORIES:
-            products = scrape_category(driver, cat_name, cat_url)
-            all_products.extend(products)
-
-        if all_products:
-            df = pd.DataFrame(all_products)
-
-            # Split product name into product, qty, unit
-            details_df = df['Product Name'].apply(split_product_details)
-            df_final = pd.concat([df[['Category', 'Description']], details_df, df[['Price']]], axis=1)
-
-            # Drop rows with missing product names
-            df_final.dropna(subset=['Product_Name'], inplace=True)
-
-            # ✅ Clean price (remove KSh, commas → numeric)
-            df_final['Price'] = (
-                df_final['Price']
-                .astype(str)
-                .str.replace(r"[^\d.]", "", regex=True)
-                .replace("", None)
-                .astype(float)
-            )
-
-            # ✅ Clean quantity (convert to numeric)
-            df_final['Quantity'] = (
-                df_final['Quantity']
-                .replace("", None)
-                .astype(float)
-            )
-
-            # Save to Excel
-            with pd.ExcelWriter(FILE_NAME, engine='openpyxl') as writer:
-            
-        
-             df_final.to_excel(writer, sheet_name="Randtech Hardware Products", index=False)
-
-            print(f"\n✅ Final product data saved to: {FILE_NAME}")
-
-        else:
-            print("⚠️ No products found at all.")
-
+        exported = export_products_csv(db, CSV_FILE)
     finally:
-        driver.quit()
-        print("Browser closed.")
+        db.close()
+
+    if not exported:
+        print("⚠️ No products found at all.")
+        return
+
+    print(f"\n✅ {exported} products saved to: {CSV_FILE}")
+
+    if WRITE_EXCEL:
+        # keep every field as text, exactly as scraped ("N/A" and "" included)
+        df = pd.read_csv(CSV_FILE, dtype=str, keep_default_na=False)
+
+        # Split product name into product, qty, unit
+        details_df = split_product_details(df['Product Name'])
+        df_final = pd.concat([df[['Category', 'Description']], details_df, df[['Price', 'Link', 'Image']]], axis=1)
+
+        # Drop rows with missing product names
+        df_final.dropna(subset=['Product_Name'], inplace=True)
+
+        # ✅ Clean price (pull the number out of "KSh 1,250.00" → numeric, junk → NaN)
+        df_final['Price'] = pd.to_numeric(
+            df_final['Price']
+            .astype(str)
+            .str.extract(r'([\d,]+\.?\d*)', expand=False)
+            .str.replace(',', '', regex=False),
+            errors='coerce'
+        )
+
+        # ✅ Clean quantity (convert to numeric)
+        df_final['Quantity'] = pd.to_numeric(df_final['Quantity'], errors='coerce')
+
+        # Save to Excel
+        with pd.ExcelWriter(FILE_NAME, engine='xlsxwriter') as writer:
+            df_final.to_excel(writer, sheet_name="Randtech Hardware Products", index=False)
+
+        print(f"✅ Final product data saved to: {FILE_NAME}")
+
+        # Parquet copy: much smaller and faster to load than xlsx
+        parquet_file = FILE_NAME.replace('.xlsx', '.parquet')
+        try:
+            df_final.to_parquet(parquet_file, index=False)
+            print(f"✅ Parquet copy saved to: {parquet_file}")
+        except ImportError as e:
+            print(f"⚠️ Parquet copy skipped: {str(e)}")
 
 if __name__ == "__main__":
     main()